@@ -1,10 +1,11 @@
 
-from flask import Flask, render_template, request, send_file
+from flask import Flask, render_template, request, send_file, jsonify, url_for, abort
 from io import BytesIO
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
-import re, csv, json, math
+import re, csv, json, math, hashlib, threading
+from collections import OrderedDict
 from generator import make_plan, generate_story_with_keywords
 
 app = Flask(__name__)
@@ -205,26 +206,58 @@ def story_to_pdf_bytes(title, story_text, page_keywords, coverage, targets, them
 
     c.save(); buf.seek(0); return buf
 
-@app.route("/preview", methods=["POST"])
-def preview():
+# --- PREVIEW CACHE ---
+# Generated stories are random, so the JSON API keeps each preview in memory and
+# serves its per-page coverage and text by id instead of regenerating on request.
+PREVIEW_CACHE_SIZE = int(os.environ.get("CAS_PREVIEW_CACHE_SIZE", "64"))
+PREVIEW_PAGE_LIMIT = 20
+PREVIEW_MAX_AGE = 3600
+PREVIEW_MAX_PAGES = 100
+_preview_cache = OrderedDict()
+_preview_lock = threading.Lock()
+
+def store_preview(entry):
+    with _preview_lock:
+        _preview_cache[entry["id"]] = entry
+        _preview_cache.move_to_end(entry["id"])
+        while len(_preview_cache) > PREVIEW_CACHE_SIZE:
+            _preview_cache.popitem(last=False)
+    return entry["id"]
+
+def get_preview(preview_id):
+    with _preview_lock:
+        entry = _preview_cache.get(preview_id)
+        if entry is not None:
+            _preview_cache.move_to_end(preview_id)
+        return entry
+
+def parse_pages(raw):
+    try:
+        pages = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"pages must be a whole number, got {raw!r}")
+    if not 1 <= pages <= PREVIEW_MAX_PAGES:
+        raise ValueError(f"pages must be between 1 and {PREVIEW_MAX_PAGES}, got {pages}")
+    return pages
+
+def build_preview(form, files, pages):
     # Handle uploaded lexicon (if any)
-    up = request.files.get('lexicon')
+    up = files.get('lexicon')
     if up and up.filename.endswith('.csv'):
         save_path = os.path.join(app.root_path, 'user_lexicon.csv')
         up.save(save_path)
         os.environ['CAS_LEXICON_PATH'] = save_path
-    title = request.form.get("title","CAS Story")
-    mode = request.form.get("mode","mixed")
-    theme = request.form.get("theme","cookies")
-    pages = int(request.form.get("pages","10"))
-    phrases = [p.strip() for p in request.form.get("phrases","I want a cookie,I go,You go,Out").split(",") if p.strip()]
-    shapes = request.form.getlist("shapes") or ["CV","CVC"]
+    title = form.get("title","CAS Story")
+    mode = form.get("mode","mixed")
+    theme = form.get("theme","cookies")
+    phrases = [p.strip() for p in form.get("phrases","I want a cookie,I go,You go,Out").split(",") if p.strip()]
+    shapes = form.getlist("shapes") or ["CV","CVC"]
 
     targets = []
     for i in range(1,6):
-        ph = request.form.get(f"t{i}_phoneme","").strip()
-        pos = request.form.get(f"t{i}_position","").strip().lower()
-        reps = request.form.get(f"t{i}_reps","").strip()
+        ph = form.get(f"t{i}_phoneme","").strip()
+        pos = form.get(f"t{i}_position","").strip().lower()
+        reps = form.get(f"t{i}_reps","").strip()
         if ph and pos in {"initial","medial","final"}:
             try:
                 reps = int(reps) if reps else 3
@@ -244,21 +277,167 @@ def preview():
 
     hidden_fields = {}
     for k in ["title","mode","theme","pages","phrases","t1_phoneme","t1_position","t1_reps","t2_phoneme","t2_position","t2_reps","t3_phoneme","t3_position","t3_reps","t4_phoneme","t4_position","t4_reps","t5_phoneme","t5_position","t5_reps"]:
-        v = request.form.get(k,"")
+        v = form.get(k,"")
         hidden_fields[k] = v
     for s in shapes:
         hidden_fields.setdefault("shapes", s)
 
     target_keys = [f"{t['phoneme'].lower()}_{t['position']}" for t in (targets if targets else [{"phoneme":"w","position":"initial"},{"phoneme":"k","position":"final"}])]
+    page_rows = []
+    for row in cov["per_page"]:
+        data = cov["pages_map"].get(row["page"], {"lines": [], "footnotes": []})
+        page_rows.append({"page": row["page"], "counts": row["counts"], "unknown": row["unknown"],
+                          "lines": data["lines"], "footnotes": data["footnotes"]})
+
+    # Same inputs + same story -> same id, so the id doubles as a stable ETag.
+    digest = hashlib.sha1(json.dumps([hidden_fields, shapes, story_text], sort_keys=True).encode("utf-8"))
+    entry = {
+        "id": digest.hexdigest()[:16],
+        "title": title, "mode": mode, "theme": theme, "pages": pages,
+        "phrases": phrases, "shapes": shapes,
+        "target_keys": target_keys,
+        "totals": totals_tbl,
+        "phrase_counts": [{"phrase":ph,"count":cov["phrase_counts"].get(ph,0)} for ph in phrases],
+        "checklist": checklist,
+        "page_rows": page_rows,
+        "hidden_fields": hidden_fields,
+    }
+    return entry
+
+def cacheable_json(payload, etag):
+    resp = jsonify(payload)
+    resp.set_etag(etag)
+    resp.cache_control.private = True
+    resp.cache_control.max_age = PREVIEW_MAX_AGE
+    return resp.make_conditional(request)
+
+def api_error(message, status, preview_id=None):
+    body = {"error": message}
+    if preview_id is not None:
+        body["id"] = preview_id
+    return jsonify(body), status
+
+def preview_not_found(preview_id):
+    return api_error("preview not found or expired", 404, preview_id)
+
+def parse_int_arg(args, name, default):
+    raw = args.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a whole number, got {raw!r}")
+
+def page_range(pv, start, limit, with_text):
+    rows = [r for r in pv["page_rows"] if start <= r["page"] < start + limit]
+    out = []
+    for r in rows:
+        item = {"page": r["page"], "counts": r["counts"], "unknown": r["unknown"]}
+        if with_text:
+            item["lines"] = r["lines"]; item["footnotes"] = r["footnotes"]
+        out.append(item)
+    last = pv["page_rows"][-1]["page"] if pv["page_rows"] else 0
+    next_start = start + limit if start + limit <= last else None
+    return {"id": pv["id"], "start": start, "limit": limit, "page_count": len(pv["page_rows"]),
+            "pages": out, "next": url_for("api_preview_pages", preview_id=pv["id"], start=next_start, limit=limit, text=1 if with_text else None) if next_start else None}
+
+@app.route("/preview", methods=["POST"])
+def preview():
+    try:
+        pages = parse_pages(request.form.get("pages","10"))
+    except ValueError as e:
+        abort(400, description=str(e))
+    pv = build_preview(request.form, request.files, pages)
+    more_pages = len(pv["page_rows"]) > PREVIEW_PAGE_LIMIT
+    # Only previews too long to render in one go need the API for "Load more".
+    if more_pages:
+        store_preview(pv)
     return render_template("preview.html",
-        title=title, mode=mode, theme=theme, pages=pages, phrases=phrases, shapes=shapes,
-        checklist=checklist, totals=totals_tbl,
-        phrase_counts=[{"phrase":ph,"count":cov["phrase_counts"].get(ph,0)} for ph in phrases],
-        target_keys=target_keys,
-        per_page=cov["per_page"],
-        hidden_fields=hidden_fields
+        preview_id=pv["id"], page_limit=PREVIEW_PAGE_LIMIT,
+        first_rows=pv["page_rows"][:PREVIEW_PAGE_LIMIT],
+        more_pages=more_pages,
+        page_count=len(pv["page_rows"]),
+        title=pv["title"], mode=pv["mode"], theme=pv["theme"], pages=pv["pages"],
+        phrases=pv["phrases"], shapes=pv["shapes"],
+        checklist=pv["checklist"], totals=pv["totals"],
+        phrase_counts=pv["phrase_counts"],
+        target_keys=pv["target_keys"],
+        hidden_fields=pv["hidden_fields"]
     )
 
+def preview_summary(pv):
+    return {
+        "id": pv["id"],
+        "title": pv["title"], "mode": pv["mode"], "theme": pv["theme"],
+        "phrases": pv["phrases"], "shapes": pv["shapes"],
+        "page_count": len(pv["page_rows"]),
+        "target_keys": pv["target_keys"],
+        "totals": pv["totals"],
+        "phrase_counts": pv["phrase_counts"],
+        "checklist": [{"item": it["item"], "ok": it["ok"], "notes": it["notes"]} for it in pv["checklist"]],
+        "pages_url": url_for("api_preview_pages", preview_id=pv["id"]),
+    }
+
+@app.route("/api/preview", methods=["POST"])
+def api_preview():
+    """
+    Generate and store a preview; returns its summary.
+    Query: pages_limit=N (max PREVIEW_PAGE_LIMIT) to also return pages 1..N inline
+           under "first_pages", text=1 to include their story lines and footnotes.
+    """
+    try:
+        pages = parse_pages(request.form.get("pages","10"))
+        pages_limit = parse_int_arg(request.args, "pages_limit", 0)
+    except ValueError as e:
+        return api_error(str(e), 400)
+    if not 0 <= pages_limit <= PREVIEW_PAGE_LIMIT:
+        return api_error(f"pages_limit must be between 0 and {PREVIEW_PAGE_LIMIT}, got {pages_limit}", 400)
+    with_text = request.args.get("text", "0") in {"1", "true", "yes"}
+    pv = build_preview(request.form, request.files, pages)
+    store_preview(pv)
+    payload = preview_summary(pv)
+    if pages_limit:
+        payload["first_pages"] = page_range(pv, 1, pages_limit, with_text)
+    resp = jsonify(payload)
+    resp.status_code = 201
+    resp.headers["Location"] = url_for("api_preview_get", preview_id=pv["id"])
+    return resp
+
+@app.route("/api/preview/<preview_id>", methods=["GET"])
+def api_preview_get(preview_id):
+    pv = get_preview(preview_id)
+    if pv is None:
+        return preview_not_found(preview_id)
+    return cacheable_json(preview_summary(pv), pv["id"])
+
+@app.route("/api/preview/<preview_id>/pages", methods=["GET"])
+def api_preview_pages(preview_id):
+    """
+    Per-page coverage for a stored preview.
+    Query: start (1-based page number, default 1), limit (default/max PREVIEW_PAGE_LIMIT),
+           text=1 to include each page's story lines and footnotes.
+    """
+    pv = get_preview(preview_id)
+    if pv is None:
+        return preview_not_found(preview_id)
+    try:
+        start = parse_int_arg(request.args, "start", 1)
+        limit = parse_int_arg(request.args, "limit", PREVIEW_PAGE_LIMIT)
+    except ValueError as e:
+        return api_error(str(e), 400, preview_id)
+    if start < 1:
+        return api_error(f"start must be at least 1, got {start}", 400, preview_id)
+    if not 1 <= limit <= PREVIEW_PAGE_LIMIT:
+        return api_error(f"limit must be between 1 and {PREVIEW_PAGE_LIMIT}, got {limit}", 400, preview_id)
+    page_count = len(pv["page_rows"])
+    if start > page_count:
+        return api_error(f"start {start} is past the last page ({page_count})", 416, preview_id)
+    with_text = request.args.get("text", "0") in {"1", "true", "yes"}
+
+    payload = page_range(pv, start, limit, with_text)
+    return cacheable_json(payload, f"{pv['id']}-{start}-{limit}-{int(with_text)}")
+
 def build_checklist(coverage, targets, phrases, story_text, allowed_shapes):
     pages = coverage["per_page"]
     totals = coverage["totals"]
@@ -333,7 +512,10 @@ def generate():
     title = request.form.get("title","CAS Story")
     mode = request.form.get("mode","mixed")
     theme = request.form.get("theme","cookies")
-    pages = int(request.form.get("pages","10"))
+    try:
+        pages = parse_pages(request.form.get("pages","10"))
+    except ValueError as e:
+        abort(400, description=str(e))
     phrases = [p.strip() for p in request.form.get("phrases","I want a cookie,I go,You go,Out").split(",") if p.strip()]
     shapes = request.form.getlist("shapes") or ["CV","CVC"]
 
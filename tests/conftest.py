@@ -0,0 +1,16 @@
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+
+
+@pytest.fixture
+def client():
+    app_module._preview_cache.clear()
+    app_module.app.config["TESTING"] = True
+    with app_module.app.test_client() as c:
+        yield c
+    app_module._preview_cache.clear()
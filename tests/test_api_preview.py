@@ -0,0 +1,81 @@
+import app as app_module
+
+
+def post_preview(client, pages="12", query=""):
+    return client.post("/api/preview" + query, data={"pages": pages, "t1_phoneme": "w", "t1_position": "initial", "t1_reps": "4"})
+
+
+def test_post_returns_201_with_location_and_no_cache_headers(client):
+    r = post_preview(client)
+    assert r.status_code == 201
+    body = r.get_json()
+    assert r.headers["Location"] == f"/api/preview/{body['id']}"
+    assert "ETag" not in r.headers and "Cache-Control" not in r.headers
+    assert body["page_count"] == 12
+    assert "first_pages" not in body
+    assert client.get(r.headers["Location"]).get_json()["id"] == body["id"]
+
+
+def test_post_can_return_first_pages_inline(client):
+    body = post_preview(client, query="?pages_limit=5&text=1").get_json()
+    first = body["first_pages"]
+    assert [p["page"] for p in first["pages"]] == [1, 2, 3, 4, 5]
+    assert "lines" in first["pages"][0]
+    assert "start=6" in first["next"]
+
+
+def test_get_returns_304_on_if_none_match(client):
+    url = post_preview(client).get_json()["pages_url"]
+    r = client.get(url)
+    assert r.status_code == 200 and r.headers["ETag"]
+    assert "max-age" in r.headers["Cache-Control"]
+    again = client.get(url, headers={"If-None-Match": r.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_next_link_stops_at_last_page(client):
+    url = post_preview(client).get_json()["pages_url"]
+    seen = []
+    next_url = url + "?limit=5"
+    while next_url:
+        data = client.get(next_url).get_json()
+        seen += [p["page"] for p in data["pages"]]
+        next_url = data["next"]
+    assert seen == list(range(1, 13))
+
+
+def test_bad_pages_returns_json_400(client):
+    for pages in ("abc", "0", "500"):
+        r = post_preview(client, pages=pages)
+        assert r.status_code == 400
+        assert "pages" in r.get_json()["error"]
+    assert len(app_module._preview_cache) == 0
+
+
+def test_bad_range_query(client):
+    url = post_preview(client).get_json()["pages_url"]
+    assert client.get(url + "?start=abc").status_code == 400
+    assert client.get(url + "?limit=-5").status_code == 400
+    r = client.get(url + "?start=13")
+    assert r.status_code == 416
+    assert "ETag" not in r.headers
+
+
+def test_evicted_id_returns_404(client, monkeypatch):
+    monkeypatch.setattr(app_module, "PREVIEW_CACHE_SIZE", 1)
+    first = post_preview(client).get_json()
+    post_preview(client, pages="8")
+    r = client.get(first["pages_url"])
+    assert r.status_code == 404
+    assert r.get_json() == {"error": "preview not found or expired", "id": first["id"]}
+
+
+def test_html_preview_rejects_bad_pages_and_skips_cache_for_short_books(client):
+    assert client.post("/preview", data={"pages": "150"}).status_code == 400
+    assert client.post("/generate", data={"pages": "0"}).status_code == 400
+    r = client.post("/preview", data={"pages": "10"})
+    assert r.status_code == 200
+    assert len(app_module._preview_cache) == 0
+    r = client.post("/preview", data={"pages": "30"})
+    assert b"data-next-url" in r.data
+    assert len(app_module._preview_cache) == 1